@@ -6,6 +6,10 @@ jinja2schema.config
 from .order_number import OrderNumber
 
 
+_VARIABLE_INDEX_TYPES = frozenset(('dictionary', 'list'))
+_INTEGER_INDEX_TYPES = frozenset(('dictionary', 'list', 'tuple'))
+
+
 class Config(object):
     """Configuration."""
 
@@ -68,10 +72,10 @@ class Config(object):
                  TEMPLATE_DIR='templates',
                  ORDER_NUMBER=False,
                  ORDER_NUMBER_SUB_COUNTER=True):
-        if TYPE_OF_VARIABLE_INDEXED_WITH_VARIABLE_TYPE not in ('dictionary', 'list'):
+        if TYPE_OF_VARIABLE_INDEXED_WITH_VARIABLE_TYPE not in _VARIABLE_INDEX_TYPES:
             raise ValueError('TYPE_OF_VARIABLE_INDEXED_WITH_VARIABLE_TYPE must be'
                              'either "dictionary" or "list"')
-        if TYPE_OF_VARIABLE_INDEXED_WITH_INTEGER_TYPE not in ('dictionary', 'list', 'tuple'):
+        if TYPE_OF_VARIABLE_INDEXED_WITH_INTEGER_TYPE not in _INTEGER_INDEX_TYPES:
             raise ValueError('TYPE_OF_VARIABLE_INDEXED_WITH_VARIABLE_TYPE must be'
                              'either "dictionary", "tuple" or "list"')
         self.TYPE_OF_VARIABLE_INDEXED_WITH_INTEGER_TYPE = TYPE_OF_VARIABLE_INDEXED_WITH_INTEGER_TYPE
@@ -3,33 +3,58 @@
 jinja2schema.core
 ~~~~~~~~~~~~~~~~~
 """
+import functools
+
 import jinja2
 
 from .config import Config
 from .model import Dictionary, List, Tuple, Scalar, Number, Unknown, Boolean, String
 from .visitors import visit
-from . import _compat
+
+
+_default_jinja2_env = None
+
+
+def _get_default_jinja2_env():
+    global _default_jinja2_env
+    if _default_jinja2_env is None:
+        _default_jinja2_env = jinja2.Environment()
+    return _default_jinja2_env
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_with_default_env(template):
+    return _get_default_jinja2_env().parse(template)
 
 
 def parse(template, jinja2_env=None):
     """Parses Jinja2 template and returns it's AST.
 
+    Parses of the same template through the default environment are cached,
+    so the returned AST may be shared between calls and should not be
+    modified.
+
     :type template: basestring
     :type jinja2_env: :class:`jinja2.Environment`
     :rtype: :class:`jinja2.nodes.Template`
     """
-    if jinja2_env is None:
-        jinja2_env = jinja2.Environment()
-    return jinja2_env.parse(template)
+    if jinja2_env is not None:
+        return jinja2_env.parse(template)
+    return _parse_with_default_env(template)
 
 
 def _ignore_constants(var):
-    if isinstance(var, Dictionary):
-        for k, v in list(_compat.iteritems(var)):
-            if v.constant and not v.may_be_defined:
-                del var[k]
-            else:
-                _ignore_constants(v)
+    stack = [var]
+    while stack:
+        struct = stack.pop()
+        if not isinstance(struct, Dictionary):
+            continue
+        data = struct.data
+        survivors = {k: v for k, v in data.items()
+                     if not (v.constant and not v.may_be_defined)}
+        if len(survivors) != len(data):
+            struct.data = survivors
+        stack.extend(survivors.values())
     return var
 
 
@@ -82,6 +107,52 @@ class JSONSchemaDraft4Encoder(object):
             rv['order_number'] = var.order_nr
         return rv
 
+    def _encode_dictionary(self, var, rv):
+        rv.update({
+            'type': 'object',
+            'properties': dict((k, self.encode(v)) for k, v in var.data.items()),
+            'required': [k for k, v in var.data.items() if v.required],
+        })
+
+    def _encode_list(self, var, rv):
+        rv.update({
+            'type': 'array',
+            'items': self.encode(var.item),
+        })
+
+    def _encode_tuple(self, var, rv):
+        rv.update({
+            'type': 'array',
+            'items': [self.encode(item) for item in var.items],
+        })
+
+    def _encode_unknown(self, var, rv):
+        rv['anyOf'] = [
+            {'type': 'object'},
+            {'type': 'array'},
+            {'type': 'string'},
+            {'type': 'number'},
+            {'type': 'boolean'},
+            {'type': 'null'},
+        ]
+
+    def _encode_string(self, var, rv):
+        rv['type'] = 'string'
+
+    def _encode_number(self, var, rv):
+        rv['type'] = 'number'
+
+    def _encode_boolean(self, var, rv):
+        rv['type'] = 'boolean'
+
+    def _encode_scalar(self, var, rv):
+        rv['anyOf'] = [
+            {'type': 'boolean'},
+            {'type': 'null'},
+            {'type': 'number'},
+            {'type': 'string'},
+        ]
+
     def encode(self, var):
         """Returns a JSON schema of variable `var`.
 
@@ -89,47 +160,33 @@ class JSONSchemaDraft4Encoder(object):
         :rtype: :class:`dict`
         """
         rv = self.encode_common_attrs(var)
-        if isinstance(var, Dictionary):
-            rv.update({
-                'type': 'object',
-                'properties': dict((k, self.encode(v)) for k, v in var.iteritems()),
-                'required': [k for k, v in var.iteritems() if v.required],
-            })
-        elif isinstance(var, List):
-            rv.update({
-                'type': 'array',
-                'items': self.encode(var.item),
-            })
-        elif isinstance(var, Tuple):
-            rv.update({
-                'type': 'array',
-                'items': [self.encode(item) for item in var.items],
-            })
-        elif isinstance(var, Unknown):
-            rv['anyOf'] = [
-                {'type': 'object'},
-                {'type': 'array'},
-                {'type': 'string'},
-                {'type': 'number'},
-                {'type': 'boolean'},
-                {'type': 'null'},
-            ]
-        elif isinstance(var, String):
-            rv['type'] = 'string'
-        elif isinstance(var, Number):
-            rv['type'] = 'number'
-        elif isinstance(var, Boolean):
-            rv['type'] = 'boolean'
-        elif isinstance(var, Scalar):
-            rv['anyOf'] = [
-                {'type': 'boolean'},
-                {'type': 'null'},
-                {'type': 'number'},
-                {'type': 'string'},
-            ]
+        var_cls = type(var)
+        handler = self._encoders.get(var_cls)
+        if handler is None and var_cls not in self._encoders:
+            # an unregistered subclass: resolve through the MRO once and
+            # remember the answer (including "no handler")
+            for cls in var_cls.__mro__:
+                handler = self._encoders.get(cls)
+                if handler is not None:
+                    break
+            self._encoders[var_cls] = handler
+        if handler is not None:
+            handler(self, var, rv)
         return rv
 
 
+JSONSchemaDraft4Encoder._encoders = {
+    Dictionary: JSONSchemaDraft4Encoder._encode_dictionary,
+    List: JSONSchemaDraft4Encoder._encode_list,
+    Tuple: JSONSchemaDraft4Encoder._encode_tuple,
+    Unknown: JSONSchemaDraft4Encoder._encode_unknown,
+    String: JSONSchemaDraft4Encoder._encode_string,
+    Number: JSONSchemaDraft4Encoder._encode_number,
+    Boolean: JSONSchemaDraft4Encoder._encode_boolean,
+    Scalar: JSONSchemaDraft4Encoder._encode_scalar,
+}
+
+
 class StringJSONSchemaDraft4Encoder(JSONSchemaDraft4Encoder):
     """Encodes :class:`.model.Unknown` and :class:`.model.Scalar` (but not it's subclasses --
     :class:`.model.String`, :class:`.model.Number` or :class:`.model.Boolean`) variables as strings.
@@ -6,6 +6,18 @@ jinja2schema.exceptions
 from jinja2schema.model import Scalar
 
 
+def _get_label(s):
+    return 'unnamed variable' if s.label is None else 'variable "{0}"'.format(s.label)
+
+
+def _get_usage(s):
+    return s.__class__.__name__.lower()
+
+
+def _get_linenos(s):
+    return ', '.join(map(str, s.linenos))
+
+
 class InferException(Exception):
     """Base class for jinja2schema exceptions."""
 
@@ -26,15 +38,10 @@ class MergeException(InferException):
         self.snd = snd
 
     def __str__(self):
-        get_label = lambda s: 'unnamed variable' if s.label is None else 'variable "{0}"'.format(s.label)
-        def get_usage(s):
-            return s.__class__.__name__.lower()
-        get_linenos = lambda s: ', '.join(map(str, s.linenos))
-        return ('{fst_label} (used as {fst_usage} on lines {fst_linenos}) conflicts with '
-                '{snd_label} (used as {snd_usage} on lines: {snd_linenos})').format(
-                    fst_label=get_label(self.fst), snd_label=get_label(self.snd),
-                    fst_usage=get_usage(self.fst), snd_usage=get_usage(self.snd),
-                    fst_linenos=get_linenos(self.fst), snd_linenos=get_linenos(self.snd))
+        return (f'{_get_label(self.fst)} (used as {_get_usage(self.fst)} '
+                f'on lines {_get_linenos(self.fst)}) conflicts with '
+                f'{_get_label(self.snd)} (used as {_get_usage(self.snd)} '
+                f'on lines: {_get_linenos(self.snd)})')
 
 
 class UnexpectedExpression(InferException):
@@ -61,13 +68,10 @@ class UnexpectedExpression(InferException):
         self.actual_struct = actual_struct
 
     def __str__(self):
-        return ('conflict on the line {lineno}\n'
-                'got: AST node jinja2.nodes.{node} of structure {actual_struct}\n'
-                'expected structure: {expected_struct}').format(
-                    lineno=self.actual_ast.lineno,
-                    node=self.actual_ast.__class__.__name__,
-                    actual_struct=self.actual_struct,
-                    expected_struct=self.expected_struct)
+        return (f'conflict on the line {self.actual_ast.lineno}\n'
+                f'got: AST node jinja2.nodes.{self.actual_ast.__class__.__name__} '
+                f'of structure {self.actual_struct}\n'
+                f'expected structure: {self.expected_struct}')
 
 
 class InvalidExpression(InferException):
@@ -84,4 +88,4 @@ class InvalidExpression(InferException):
         self.message = message
 
     def __str__(self):
-        return 'line {0}: {1}'.format(self.ast.lineno, self.message)
\ No newline at end of file
+        return f'line {self.ast.lineno}: {self.message}'
\ No newline at end of file
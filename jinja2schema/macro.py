@@ -3,7 +3,6 @@
 jinja2schema.macro
 ~~~~~~~~~~~~~~~~~~
 """
-from . import _compat
 from .config import default_config
 from .mergers import merge
 from .model import Unknown, Dictionary
@@ -54,12 +53,12 @@ class MacroCall(object):
 
     def _match_passed_args(self, to_args):
         rv = Dictionary()
-        matched_args = list(zip(self.passed_args, to_args))
-        for i, ((arg_ast, arg), (expected_arg_name, expected_arg)) in enumerate(matched_args, start=1):
+        matched = min(len(self.passed_args), len(to_args))
+        for (arg_ast, arg), (expected_arg_name, expected_arg) in zip(self.passed_args, to_args):
             _, s = visit_expr(arg_ast, Context(predicted_struct=merge(arg, expected_arg)), config=self.config)
             rv = merge(rv, s)
-        del self.passed_args[:len(matched_args)]
-        del to_args[:len(matched_args)]
+        del self.passed_args[:matched]
+        del to_args[:matched]
         return rv
 
     def match_passed_args_to_expected_args(self):
@@ -70,15 +69,23 @@ class MacroCall(object):
 
     def _match_passed_kwargs(self, to_args):
         rv = Dictionary()
-        for kwarg_name, (kwarg_ast, kwarg_type) in list(_compat.iteritems(self.passed_kwargs)):
-            for (expected_arg_name, expected_arg_struct) in list(to_args):
-                if kwarg_name == expected_arg_name:
-                    _, s = visit_expr(kwarg_ast.value,
-                                      Context(predicted_struct=merge(kwarg_type, expected_arg_struct)),
-                                      config=self.config)
-                    rv = merge(rv, s)
-                    to_args.remove((expected_arg_name, expected_arg_struct))
-                    del self.passed_kwargs[kwarg_name]
+        # index the expected arguments by name once instead of rescanning
+        # the list for every passed keyword argument
+        expected_indexes = {name: i for i, (name, _) in enumerate(to_args)}
+        consumed_indexes = set()
+        for kwarg_name in list(self.passed_kwargs):
+            i = expected_indexes.get(kwarg_name)
+            if i is None:
+                continue
+            kwarg_ast, kwarg_type = self.passed_kwargs[kwarg_name]
+            _, s = visit_expr(kwarg_ast.value,
+                              Context(predicted_struct=merge(kwarg_type, to_args[i][1])),
+                              config=self.config)
+            rv = merge(rv, s)
+            consumed_indexes.add(i)
+            del self.passed_kwargs[kwarg_name]
+        if consumed_indexes:
+            to_args[:] = [arg for i, arg in enumerate(to_args) if i not in consumed_indexes]
         return rv
 
     def match_passed_kwargs_to_expected_args(self):
@@ -3,12 +3,118 @@
 jinja2schema.mergers
 ~~~~~~~~~~~~~~~~~~~~
 """
-import itertools
+from itertools import zip_longest
+
 from jinja2schema.util import debug_repr
 
 from .model import Scalar, Dictionary, List, Unknown, Tuple
 from .exceptions import MergeException
-from ._compat import zip_longest
+
+
+def _merge_sorted_unique(fst_linenos, snd_linenos):
+    """Merges two sorted lists of line numbers into a new sorted list
+    without duplicates.
+    """
+    if not fst_linenos:
+        return list(snd_linenos)
+    if not snd_linenos:
+        return list(fst_linenos)
+    if fst_linenos[-1] < snd_linenos[0]:
+        # the common case: ``fst`` occurs in template before ``snd``
+        return fst_linenos + snd_linenos
+    rv = []
+    i, j = 0, 0
+    fst_len, snd_len = len(fst_linenos), len(snd_linenos)
+    while i < fst_len and j < snd_len:
+        fst_lineno, snd_lineno = fst_linenos[i], snd_linenos[j]
+        if fst_lineno <= snd_lineno:
+            lineno = fst_lineno
+            i += 1
+            if fst_lineno == snd_lineno:
+                j += 1
+        else:
+            lineno = snd_lineno
+            j += 1
+        if not rv or rv[-1] != lineno:
+            rv.append(lineno)
+    for lineno in fst_linenos[i:] or snd_linenos[j:]:
+        if not rv or rv[-1] != lineno:
+            rv.append(lineno)
+    return rv
+
+
+def _merge_with_unknown_fst(fst, snd, custom_merger):
+    return snd.clone()
+
+
+def _merge_with_unknown_snd(fst, snd, custom_merger):
+    return fst.clone()
+
+
+def _make_scalar_merger(result_type):
+    def merger(fst, snd, custom_merger):
+        return result_type()
+    return merger
+
+
+def _merge_dictionaries(fst, snd, custom_merger):
+    # one side being empty is frequent -- accumulators start as empty
+    # Dictionaries -- and needs no key matching at all
+    if not fst.data:
+        return Dictionary({k: v.clone() for k, v in snd.data.items()})
+    if not snd.data:
+        return Dictionary({k: v.clone() for k, v in fst.data.items()})
+    result = Dictionary()
+    result_data = result.data
+    snd_data = snd.data
+    for k, v in fst.data.items():
+        snd_v = snd_data.get(k)
+        if snd_v is not None:
+            result_data[k] = merge(v, snd_v, custom_merger=custom_merger)
+        else:
+            result_data[k] = v.clone()
+    for k, v in snd_data.items():
+        if k not in result_data:
+            result_data[k] = v.clone()
+    return result
+
+
+def _merge_lists(fst, snd, custom_merger):
+    return List(merge(fst.item, snd.item, custom_merger=custom_merger))
+
+
+def _merge_tuples(fst, snd, custom_merger):
+    if fst.items is snd.items is None:
+        return Tuple(None)
+    if len(fst.items) != len(snd.items) and not (fst.may_be_extended or snd.may_be_extended):
+        raise MergeException(fst, snd)
+    return Tuple([merge(a, b, custom_merger=custom_merger)
+                  for a, b in zip_longest(fst.items, snd.items, fillvalue=Unknown())])
+
+
+def _resolve_merge_handler(fst_type, snd_type):
+    """Returns a merge handler for a pair of variable types, or ``None``
+    if the types are incompatible.
+    """
+    if issubclass(fst_type, Unknown):
+        return _merge_with_unknown_fst
+    if issubclass(snd_type, Unknown):
+        return _merge_with_unknown_snd
+    if issubclass(fst_type, Scalar) and issubclass(snd_type, Scalar):
+        if issubclass(fst_type, snd_type):
+            return _make_scalar_merger(fst_type)
+        if issubclass(snd_type, fst_type):
+            return _make_scalar_merger(snd_type)
+        return None
+    for cls, handler in ((Dictionary, _merge_dictionaries),
+                         (List, _merge_lists),
+                         (Tuple, _merge_tuples)):
+        if issubclass(fst_type, cls) and issubclass(snd_type, cls):
+            return handler
+    return None
+
+
+_merge_handlers = {}
 
 
 def merge(fst, snd, custom_merger=None):
@@ -30,42 +136,22 @@ def merge(fst, snd, custom_merger=None):
     #         (fst.linenos == snd.linenos) or  # TODO this is a hack
     #         max(fst.linenos) <= min(snd.linenos))
 
-    if isinstance(fst, Unknown):
-        result = snd.clone()
-    elif isinstance(snd, Unknown):
-        result = fst.clone()
-    elif isinstance(fst, Scalar) and isinstance(snd, Scalar):
-        fst_type = type(fst)
-        snd_type = type(snd)
-        if issubclass(fst_type, snd_type):
-            result = fst_type()
-        elif issubclass(snd_type, fst_type):
-            result = snd_type()
-        else:
+    if fst is snd and custom_merger is None:
+        # merging a variable with itself is a no-op
+        return fst
+
+    key = (type(fst), type(snd))
+    handler = _merge_handlers.get(key)
+    if handler is None:
+        handler = _resolve_merge_handler(*key)
+        if handler is None:
             raise MergeException(fst, snd)
-    elif isinstance(fst, Dictionary) and isinstance(snd, Dictionary):
-        result = Dictionary()
-        for k in set(itertools.chain(fst.iterkeys(), snd.iterkeys())):
-            if k in fst and k in snd:
-                result[k] = merge(fst[k], snd[k], custom_merger=custom_merger)
-            elif k in fst:
-                result[k] = fst[k].clone()
-            elif k in snd:
-                result[k] = snd[k].clone()
-    elif isinstance(fst, List) and isinstance(snd, List):
-        result = List(merge(fst.item, snd.item, custom_merger=custom_merger))
-    elif isinstance(fst, Tuple) and isinstance(snd, Tuple):
-        if fst.items is snd.items is None:
-            result = Tuple(None)
-        else:
-            if len(fst.items) != len(snd.items) and not (fst.may_be_extended or snd.may_be_extended):
-                raise MergeException(fst, snd)
-            result = Tuple([merge(a, b, custom_merger=custom_merger)
-                            for a, b in zip_longest(fst.items, snd.items, fillvalue=Unknown())])
-    else:
-        raise MergeException(fst, snd)
+        # the isinstance/issubclass resolution runs at most once per pair
+        # of concrete variable types
+        _merge_handlers[key] = handler
+    result = handler(fst, snd, custom_merger)
     result.label = fst.label or snd.label
-    result.linenos = list(sorted(set(fst.linenos + snd.linenos)))
+    result.linenos = _merge_sorted_unique(fst.linenos, snd.linenos)
     result.constant = fst.constant
     result.may_be_defined = fst.may_be_defined
     result.used_with_default = fst.used_with_default and snd.used_with_default
@@ -74,17 +160,29 @@ def merge(fst, snd, custom_merger=None):
     if fst.value == snd.value:
         result.value = fst.value
     result.order_nr = fst.order_nr
-    if callable(custom_merger):
+    if custom_merger is not None:
         result = custom_merger(fst, snd, result)
     return result
 
 
+def merge_or_none(fst, snd, custom_merger=None):
+    """The same as :func:`merge`, but returns ``None`` instead of raising
+    :class:`.exceptions.MergeException` when the variables are incompatible.
+
+    Useful for callers that treat a failed merge as a normal outcome rather
+    than an error.
+    """
+    try:
+        return merge(fst, snd, custom_merger=custom_merger)
+    except MergeException:
+        return None
+
+
 def merge_many(fst, snd, *args):
     struct = merge(fst, snd)
-    if args:
-        return merge_many(struct, *args)
-    else:
-        return struct
+    for arg in args:
+        struct = merge(struct, arg)
+    return struct
 
 
 def merge_bool_expr_structs(fst, snd, operator=None):
@@ -97,6 +195,8 @@ def merge_bool_expr_structs(fst, snd, operator=None):
 
 def merge_rtypes(fst, snd, operator=None):
     if operator in ('+', '-'):
-        if type(fst) is not type(snd) and not (isinstance(fst, Unknown) or isinstance(snd, Unknown)):
+        fst_type = type(fst)
+        snd_type = type(snd)
+        if fst_type is not snd_type and fst_type is not Unknown and snd_type is not Unknown:
             raise MergeException(fst, snd)
     return merge(fst, snd)
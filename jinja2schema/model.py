@@ -7,8 +7,6 @@ import pprint
 
 from jinja2 import nodes
 
-from . import _compat
-
 
 class Variable(object):
     """A base variable class.
@@ -52,6 +50,10 @@ class Variable(object):
 
         Value of the variable in template. Set by default filter or assignment.
     """
+    __slots__ = ('label', 'linenos', 'constant', 'may_be_defined',
+                 'used_with_default', 'checked_as_undefined',
+                 'checked_as_defined', 'value', 'order_nr')
+
     def __init__(self, label=None, linenos=None, constant=False,
                  may_be_defined=False, used_with_default=False,
                  checked_as_undefined=False, checked_as_defined=False,
@@ -67,8 +69,15 @@ class Variable(object):
         self.order_nr = order_nr
 
     def clone(self):
+        return self.__copy__()
+
+    def __copy__(self):
         cls = type(self)
-        return cls(**self.__dict__)
+        rv = cls.__new__(cls)
+        for base in cls.__mro__:
+            for attr in getattr(base, '__slots__', ()):
+                setattr(rv, attr, getattr(self, attr))
+        return rv
 
     @classmethod
     def _get_kwargs_from_ast(cls, ast):
@@ -85,18 +94,20 @@ class Variable(object):
         :param ast: AST node
         :type ast: :class:`jinja2.nodes.Node`
         """
-        for k, v in list(kwargs.items()):
-            if v is None:
-                del kwargs[k]
-        kwargs = dict(cls._get_kwargs_from_ast(ast), **kwargs)
-        return cls(**kwargs)
+        ast_kwargs = cls._get_kwargs_from_ast(ast)
+        for k, v in kwargs.items():
+            if v is not None:
+                ast_kwargs[k] = v
+        return cls(**ast_kwargs)
 
     @property
     def required(self):
-        return not any([self.may_be_defined, self.used_with_default,
-                        self.checked_as_defined, self.checked_as_undefined])
+        return not (self.may_be_defined or self.used_with_default or
+                    self.checked_as_defined or self.checked_as_undefined)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (
             type(self) is type(other) and
             self.linenos == other.linenos and
@@ -128,12 +139,15 @@ class Dictionary(Variable):
     .. automethod:: iterkeys
     .. automethod:: pop
     """
+    __slots__ = ('data',)
 
     def __init__(self, data=None, **kwargs):
         self.data = data or {}
         super(Dictionary, self).__init__(**kwargs)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return super(Dictionary, self).__eq__(other) and self.data == other.data
 
     def __repr__(self):
@@ -141,9 +155,7 @@ class Dictionary(Variable):
 
     def clone(self):
         rv = super(Dictionary, self).clone()
-        rv.data = {}
-        for k, v in _compat.iteritems(self.data):
-            rv.data[k] = v.clone()
+        rv.data = {k: v.clone() for k, v in self.data.items()}
         return rv
 
     @classmethod
@@ -173,13 +185,13 @@ class Dictionary(Variable):
         return self.data.items()
 
     def iteritems(self):
-        return _compat.iteritems(self.data)
+        return iter(self.data.items())
 
     def keys(self):
         return self.data.keys()
 
     def iterkeys(self):
-        return _compat.iterkeys(self.data)
+        return iter(self.data.keys())
 
     def pop(self, key, default=None):
         return self.data.pop(key, default)
@@ -192,11 +204,15 @@ class List(Variable):
 
         A structure of list items, subclass of :class:`Variable`.
     """
+    __slots__ = ('item',)
+
     def __init__(self, item, **kwargs):
         self.item = item
         super(List, self).__init__(**kwargs)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return super(List, self).__eq__(other) and self.item == other.item
 
     def __repr__(self):
@@ -224,12 +240,16 @@ class Tuple(Variable):
 
         Whether new elements can be added to the tuple in the process of merge or not.
     """
+    __slots__ = ('items', 'may_be_extended')
+
     def __init__(self, items, **kwargs):
         self.items = tuple(items) if items is not None else None
         self.may_be_extended = kwargs.pop('may_be_extended', False)
         super(Tuple, self).__init__(**kwargs)
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return super(Tuple, self).__eq__(other) and self.items == other.items
 
     def __repr__(self):
@@ -248,29 +268,39 @@ class Tuple(Variable):
 
 class Scalar(Variable):
     """A scalar. Either string, number, boolean or ``None``."""
+    __slots__ = ()
+
     def __repr__(self):
         return '<scalar>'
 
 
 class String(Scalar):
     """A string."""
+    __slots__ = ()
+
     def __repr__(self):
         return '<string>'
 
 
 class Number(Scalar):
     """A number."""
+    __slots__ = ()
+
     def __repr__(self):
         return '<number>'
 
 
 class Boolean(Scalar):
     """A boolean."""
+    __slots__ = ()
+
     def __repr__(self):
         return '<boolean>'
 
 
 class Unknown(Variable):
     """A variable which type is unknown."""
+    __slots__ = ()
+
     def __repr__(self):
         return '<unknown>'
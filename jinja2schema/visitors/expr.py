@@ -6,15 +6,14 @@ jinja2schema.visitors.expr
 Expression is an instance of :class:`jinja2.nodes.Expr`.
 Expression visitors return a tuple which contains expression type and expression structure.
 """
-import functools
+import copy
 
 from jinja2 import nodes
 
 from ..model import Scalar, Dictionary, List, Unknown, Tuple, String, Number, Boolean
-from ..mergers import merge_rtypes, merge, merge_many, merge_bool_expr_structs
+from ..mergers import merge_rtypes, merge, merge_or_none, merge_many, merge_bool_expr_structs
 from ..exceptions import InvalidExpression, UnexpectedExpression, MergeException
 from ..config import default_config
-from .. import _compat
 from .util import visit_many
 
 
@@ -94,30 +93,49 @@ class Context(object):
 
         (instance of context.return_struct_cls, Dictionary({data: context.predicted_struct}})
     """
+    __slots__ = ('predicted_struct', 'return_struct_cls')
+
     def __init__(self, ctx=None, return_struct_cls=None, predicted_struct=None):
-        self.predicted_struct = None
-        self.return_struct_cls = Unknown
-        if ctx:
-            self.predicted_struct = ctx.predicted_struct
-            self.return_struct_cls = ctx.return_struct_cls
-        if predicted_struct:
-            self.predicted_struct = predicted_struct
-        if return_struct_cls:
-            self.return_struct_cls = return_struct_cls
+        if ctx is not None:
+            if predicted_struct is None:
+                predicted_struct = ctx.predicted_struct
+            if return_struct_cls is None:
+                return_struct_cls = ctx.return_struct_cls
+        self.predicted_struct = predicted_struct
+        self.return_struct_cls = return_struct_cls if return_struct_cls is not None else Unknown
 
     def get_predicted_struct(self, label=None):
-        rv = self.predicted_struct.clone()
-        if label:
-            rv.label = label
+        if label is None:
+            # Visitors never mutate the returned struct in place (they only
+            # wrap it or merge it, and ``merge`` clones), so the clone can be
+            # skipped unless a label needs to be set.
+            return self.predicted_struct
+        # Only the label differs from the original, so a shallow copy is
+        # enough -- nested structures are cloned by ``merge`` whenever they
+        # end up in a result.
+        rv = copy.copy(self.predicted_struct)
+        rv.label = label
         return rv
 
     def meet(self, actual_struct, actual_ast):
-        try:
-            merge(self.predicted_struct, actual_struct)
-        except MergeException:
+        if merge_or_none(self.predicted_struct, actual_struct) is None:
             raise UnexpectedExpression(self.predicted_struct, actual_ast, actual_struct)
-        else:
-            return True
+        return True
+
+
+# Shared prototypes for ``Context.meet`` and the left operand of ``merge``.
+# Neither ever mutates its arguments, so the instances are safe to reuse;
+# they must never be returned as part of a visitor result, which callers
+# may modify in place.
+_SCALAR = Scalar()
+_BOOLEAN = Boolean()
+_DICTIONARY = Dictionary()
+_ANY_TUPLE = Tuple(None)
+_LIST_OF_UNKNOWNS = List(Unknown())
+_LIST_OF_SCALARS = List(Scalar())
+_LIST_OF_STRINGS = List(String())
+_LIST_OF_LISTS = List(List(Unknown()))
+_LIST_OF_PAIRS = List(Tuple([Scalar(), Unknown()]))
 
 
 expr_visitors = {}
@@ -130,11 +148,7 @@ def visits_expr(node_cls):
     """
     def decorator(func):
         expr_visitors[node_cls] = func
-        @functools.wraps(func)
-        def wrapped_func(ast, ctx, macroses=None, config=default_config):
-            assert isinstance(ast, node_cls)
-            return func(ast, ctx, macroses=macroses, config=config)
-        return wrapped_func
+        return func
     return decorator
 
 
@@ -146,13 +160,19 @@ def visit_expr(ast, ctx, macroses=None, config=default_config):
     :returns: a tuple where the first element is an expression type (instance of :class:`Variable`)
               and the second element is an expression structure (instance of :class:`.model.Dictionary`)
     """
-    visitor = expr_visitors.get(type(ast))
-    if not visitor:
-        for node_cls, visitor_ in _compat.iteritems(expr_visitors):
-            if isinstance(ast, node_cls):
-                visitor = visitor_
+    ast_cls = type(ast)
+    visitor = expr_visitors.get(ast_cls)
     if not visitor:
-        raise Exception('expression visitor for {0} is not found'.format(type(ast)))
+        # walk the MRO so that the most specific registered visitor wins
+        for node_cls in ast_cls.__mro__:
+            visitor = expr_visitors.get(node_cls)
+            if visitor:
+                break
+        if not visitor:
+            raise Exception('expression visitor for {0} is not found'.format(ast_cls))
+        # remember the resolution so that it runs at most once per concrete
+        # node class
+        expr_visitors[ast_cls] = visitor
     return visitor(ast, ctx, macroses, config=config)
 
 
@@ -162,7 +182,7 @@ def _visit_dict(ast, ctx, macroses, items, config=default_config):
 
     :param items: a list of (key, value); key may be either AST node or string
     """
-    ctx.meet(Dictionary(), ast)
+    ctx.meet(_DICTIONARY, ast)
     rtype = Dictionary.from_ast(ast, constant=True, order_nr=config.ORDER_OBJECT.get_next())
     struct = Dictionary()
     for key, value in items:
@@ -176,7 +196,7 @@ def _visit_dict(ast, ctx, macroses, items, config=default_config):
             struct = merge(struct, key_struct)
             if isinstance(key, nodes.Const):
                 rtype[key.value] = value_rtype
-        elif isinstance(key, _compat.string_types):
+        elif isinstance(key, str):
             rtype[key] = value_rtype
     return rtype, struct
 
@@ -196,7 +216,7 @@ def visit_unary_expr(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Compare)
 def visit_compare(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Boolean(), ast)
+    ctx.meet(_BOOLEAN, ast)
     rtype, struct = visit_expr(ast.expr, Context(
         predicted_struct=Unknown.from_ast(ast.expr, order_nr=config.ORDER_OBJECT.get_next())), macroses, config=config)
     for op in ast.ops:
@@ -228,12 +248,22 @@ def visit_name(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Getattr)
 def visit_getattr(ast, ctx, macroses=None, config=default_config):
-    context = Context(
-        ctx=ctx,
-        predicted_struct=Dictionary.from_ast(ast, {
-            ast.attr: ctx.get_predicted_struct(label=ast.attr),
-        }, order_nr=config.ORDER_OBJECT.get_next()))
-    return visit_expr(ast.node, context, macroses, config=config)
+    # Chains like ``a.b.c`` are walked iteratively: the nested predicted
+    # structure is built in one pass, so only the innermost non-Getattr node
+    # is dispatched through ``visit_expr``. The freshly built dictionaries
+    # are unshared, which makes it safe to label them in place instead of
+    # cloning at every level.
+    predicted_struct = ctx.get_predicted_struct(label=ast.attr)
+    node = ast
+    while True:
+        predicted_struct = Dictionary.from_ast(node, {
+            node.attr: predicted_struct,
+        }, order_nr=config.ORDER_OBJECT.get_next())
+        node = node.node
+        if not isinstance(node, nodes.Getattr):
+            break
+        predicted_struct.label = node.attr
+    return visit_expr(node, Context(ctx=ctx, predicted_struct=predicted_struct), macroses, config=config)
 
 
 @visits_expr(nodes.Getitem)
@@ -253,7 +283,7 @@ def visit_getitem(ast, ctx, macroses=None, config=default_config):
                 items[arg.value] = ctx.get_predicted_struct()
                 predicted_struct = Tuple.from_ast(ast, tuple(items), may_be_extended=True,
                                                   order_nr=config.ORDER_OBJECT.get_next())
-        elif isinstance(arg.value, _compat.string_types):
+        elif isinstance(arg.value, str):
             predicted_struct = Dictionary.from_ast(ast, {
                 arg.value: ctx.get_predicted_struct(label=arg.value),
             }, order_nr=config.ORDER_OBJECT.get_next())
@@ -277,14 +307,18 @@ def visit_getitem(ast, ctx, macroses=None, config=default_config):
     return rtype, merge(struct, arg_struct)
 
 
+_SCALAR_TEST_NAMES = frozenset(('divisibleby', 'escaped', 'even', 'lower', 'odd', 'upper'))
+_UNKNOWN_TEST_NAMES = frozenset(('defined', 'undefined', 'equalto', 'iterable', 'mapping',
+                                 'none', 'number', 'sameas', 'sequence', 'string'))
+
+
 @visits_expr(nodes.Test)
 def visit_test(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Boolean(), ast)
-    if ast.name in ('divisibleby', 'escaped', 'even', 'lower', 'odd', 'upper'):
+    ctx.meet(_BOOLEAN, ast)
+    if ast.name in _SCALAR_TEST_NAMES:
         # TODO
         predicted_struct = Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-    elif ast.name in ('defined', 'undefined', 'equalto', 'iterable', 'mapping',
-                      'none', 'number', 'sameas', 'sequence', 'string'):
+    elif ast.name in _UNKNOWN_TEST_NAMES:
         predicted_struct = Unknown.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
         if ast.name == 'defined':
             predicted_struct.checked_as_defined = True
@@ -307,7 +341,7 @@ def visit_test(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Concat)
 def visit_concat(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Scalar(), ast)
+    ctx.meet(_SCALAR, ast)
     return String.from_ast(ast, order_nr=config.ORDER_OBJECT.get_next()), visit_many(ast.nodes, macroses, config,
                                                                                      predicted_struct_cls=String)
 
@@ -325,7 +359,7 @@ def visit_cond_expr(ast, ctx, macroses=None, config=default_config):
     struct = merge_many(if_struct, test_struct, else_struct)
     rtype = merge_rtypes(if_rtype, else_rtype)
 
-    for var_name, var_struct in test_struct.iteritems():
+    for var_name, var_struct in test_struct.items():
         if var_struct.checked_as_defined or var_struct.checked_as_undefined:
             if var_struct.checked_as_undefined:
                 lookup_struct = if_struct
@@ -362,12 +396,12 @@ def visit_call(ast, ctx, macroses=None, config=default_config):
                 raise InvalidExpression(ast, ('incorrect usage of "{0}". it takes '
                                               'exactly {1} positional arguments'.format(macro.name, len(macro.args))))
             if call.passed_kwargs:
-                first_unknown_kwarg = next(_compat.iterkeys(call.passed_kwargs))
+                first_unknown_kwarg = next(iter(call.passed_kwargs))
                 raise InvalidExpression(ast, ('incorrect usage of "{0}". unknown keyword argument '
                                               '"{1}" is passed'.format(macro.name, first_unknown_kwarg)))
             return Unknown(), args_struct
         elif ast.node.name == 'range':
-            ctx.meet(List(Unknown()), ast)
+            ctx.meet(_LIST_OF_UNKNOWNS, ast)
             struct = Dictionary()
             for arg in ast.args:
                 arg_rtype, arg_struct = visit_expr(arg, Context(
@@ -376,7 +410,7 @@ def visit_call(ast, ctx, macroses=None, config=default_config):
                 struct = merge(struct, arg_struct)
             return List(Number()), struct
         elif ast.node.name == 'lipsum':
-            ctx.meet(Scalar(), ast)
+            ctx.meet(_SCALAR, ast)
             struct = Dictionary()
             # probable TODO: set possible types for args and kwargs
             for arg in ast.args:
@@ -391,7 +425,7 @@ def visit_call(ast, ctx, macroses=None, config=default_config):
                 struct = merge(struct, arg_struct)
             return String(), struct
         elif ast.node.name == 'dict':
-            ctx.meet(Dictionary(), ast)
+            ctx.meet(_DICTIONARY, ast)
             if ast.args:
                 raise InvalidExpression(ast, 'dict accepts only keyword arguments')
             return _visit_dict(ast, ctx, macroses, [(kwarg.key, kwarg.value) for kwarg in ast.kwargs], config=config)
@@ -399,21 +433,21 @@ def visit_call(ast, ctx, macroses=None, config=default_config):
             raise InvalidExpression(ast, '"{0}" call is not supported'.format(ast.node.name))
     elif isinstance(ast.node, nodes.Getattr):
         if ast.node.attr in ('keys', 'iterkeys', 'values', 'itervalues'):
-            ctx.meet(List(Unknown()), ast)
+            ctx.meet(_LIST_OF_UNKNOWNS, ast)
             rtype, struct = visit_expr(
                     ast.node.node, Context(
                         predicted_struct=Dictionary.from_ast(ast.node.node, order_nr=config.ORDER_OBJECT.get_next())),
                     macroses, config=config)
             return List(Unknown()), struct
         if ast.node.attr in ('startswith', 'endswith'):
-            ctx.meet(Boolean(), ast)
+            ctx.meet(_BOOLEAN, ast)
             rtype, struct = visit_expr(
                     ast.node.node,
                     Context(predicted_struct=String.from_ast(ast.node.node, order_nr=config.ORDER_OBJECT.get_next())),
                     macroses, config=config)
             return Boolean(), struct
         if ast.node.attr == 'split':
-            ctx.meet(List(String()), ast)
+            ctx.meet(_LIST_OF_STRINGS, ast)
             rtype, struct = visit_expr(
                     ast.node.node,
                     Context(predicted_struct=String.from_ast(ast.node.node, order_nr=config.ORDER_OBJECT.get_next())),
@@ -428,111 +462,169 @@ def visit_call(ast, ctx, macroses=None, config=default_config):
         raise InvalidExpression(ast, '"{0}" call is not supported'.format(ast.node.attr))
 
 
-@visits_expr(nodes.Filter)
-def visit_filter(ast, ctx, macroses=None, config=default_config):
-    return_struct_cls = None
-    if ast.name in ('abs', 'striptags', 'capitalize', 'center', 'escape', 'filesizeformat',
-                    'float', 'forceescape', 'format', 'indent', 'int', 'replace', 'round',
-                    'safe', 'string', 'striptags', 'title', 'trim', 'truncate', 'upper',
-                    'urlencode', 'urlize', 'wordcount', 'wordwrap', 'e'):
-        ctx.meet(Scalar(), ast)
-        if ast.name in ('abs', 'round'):
-            node_struct = Number.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = Number
-        elif ast.name in ('float', 'int'):
-            node_struct = Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = Number
-        elif ast.name in ('striptags', 'capitalize', 'center', 'escape', 'forceescape', 'format', 'indent',
-                          'replace', 'safe', 'title', 'trim', 'truncate', 'upper', 'urlencode',
-                          'urlize', 'wordwrap', 'e'):
-            node_struct = String.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = String
-        elif ast.name == 'filesizeformat':
-            node_struct = Number.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = String
-        elif ast.name == 'string':
-            node_struct = Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = String
-        elif ast.name == 'wordcount':
-            node_struct = String.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-            return_struct_cls = Number
-        else:
-            node_struct = Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-    elif ast.name in ('batch', 'slice'):
-        ctx.meet(List(List(Unknown())), ast)
-        rtype = List(List(Unknown(), linenos=[ast.node.lineno]), linenos=[ast.node.lineno])
-        node_struct = merge(rtype, ctx.get_predicted_struct()).item
-        _, struct = visit_expr(ast.node, Context(
-            ctx=ctx,
-            return_struct_cls=return_struct_cls,
-            predicted_struct=node_struct
-        ), macroses, config=config)
-        return rtype, struct
-    elif ast.name == 'default':
-        default_value_rtype, default_value_struct = visit_expr(
-                ast.args[0],
-                Context(predicted_struct=Unknown.from_ast(ast.args[0], order_nr=config.ORDER_OBJECT.get_next())),
-                macroses, config=config)
-        node_struct = merge(
-                ctx.get_predicted_struct(),
-            default_value_rtype,
-        )
-        node_struct.used_with_default = True
-        node_struct.value = default_value_rtype.value
-    elif ast.name == 'dictsort':
-        ctx.meet(List(Tuple([Scalar(), Unknown()])), ast)
-        node_struct = Dictionary.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-    elif ast.name == 'join':
-        ctx.meet(Scalar(), ast)
-        node_struct = List.from_ast(ast.node, String(), order_nr=config.ORDER_OBJECT.get_next())
-        rtype, struct = visit_expr(ast.node, Context(
-            return_struct_cls=String,
-            predicted_struct=node_struct
-        ), macroses, config=config)
-        arg_rtype, arg_struct = visit_expr(ast.args[0],
-                                           Context(predicted_struct=String.from_ast(ast.args[0],
-                                                                                    order_nr=config.ORDER_OBJECT.get_next())),
-                                           macroses, config=config)
-        return rtype, merge(struct, arg_struct)
-    elif ast.name in ('first', 'last', 'random', 'length', 'sum'):
-        if ast.name in ('first', 'last', 'random'):
-            el_struct = ctx.get_predicted_struct()
-        elif ast.name == 'length':
-            ctx.meet(Scalar(), ast)
-            return_struct_cls = Number
-            el_struct = Unknown()
-        else:
-            ctx.meet(Scalar(), ast)
-            el_struct = Scalar()
-        node_struct = List.from_ast(ast.node, el_struct, order_nr=config.ORDER_OBJECT.get_next())
-    elif ast.name in ('groupby', 'map', 'reject', 'rejectattr', 'select', 'selectattr', 'sort'):
-        ctx.meet(List(Unknown()), ast)
-        node_struct = merge(
-            List(Unknown()),
-            ctx.get_predicted_struct()
-        )
-    elif ast.name == 'list':
-        ctx.meet(List(Scalar()), ast)
-        node_struct = merge(
-            List(Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())),
-            ctx.get_predicted_struct()
-        ).item
-    elif ast.name == 'pprint':
-        ctx.meet(Scalar(), ast)
-        node_struct = ctx.get_predicted_struct()
-    elif ast.name == 'xmlattr':
-        ctx.meet(Scalar(), ast)
-        node_struct = Dictionary.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
-    elif ast.name == 'attr':
-        raise InvalidExpression(ast, 'attr filter is not supported')
-    else:
-        raise InvalidExpression(ast, 'unknown filter')
-    rv = visit_expr(ast.node, Context(
+_SCALAR_FILTER_NAMES = frozenset(('abs', 'striptags', 'capitalize', 'center', 'escape',
+                                  'filesizeformat', 'float', 'forceescape', 'format', 'indent',
+                                  'int', 'replace', 'round', 'safe', 'string', 'title', 'trim',
+                                  'truncate', 'upper', 'urlencode', 'urlize', 'wordcount',
+                                  'wordwrap', 'e'))
+_STRING_FILTER_NAMES = frozenset(('striptags', 'capitalize', 'center', 'escape', 'forceescape',
+                                  'format', 'indent', 'replace', 'safe', 'title', 'trim',
+                                  'truncate', 'upper', 'urlencode', 'urlize', 'wordwrap', 'e'))
+_SEQUENCE_FILTER_NAMES = frozenset(('groupby', 'map', 'reject', 'rejectattr', 'select',
+                                    'selectattr', 'sort'))
+
+
+def _visit_filtered_node(ast, ctx, macroses, config, node_struct, return_struct_cls=None):
+    """A common tail of the filter handlers: visits the filtered expression
+    with the structure predicted by the filter.
+    """
+    return visit_expr(ast.node, Context(
         ctx=ctx,
         return_struct_cls=return_struct_cls,
         predicted_struct=node_struct
     ), macroses, config=config)
-    return rv
+
+
+def _make_scalar_filter_handler(node_struct_cls, return_struct_cls=None):
+    def handler(ast, ctx, macroses, config):
+        ctx.meet(_SCALAR, ast)
+        node_struct = node_struct_cls.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
+        return _visit_filtered_node(ast, ctx, macroses, config, node_struct, return_struct_cls)
+    return handler
+
+
+def _batch_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_LIST_OF_LISTS, ast)
+    rtype = List(List(Unknown(), linenos=[ast.node.lineno]), linenos=[ast.node.lineno])
+    node_struct = merge(rtype, ctx.get_predicted_struct()).item
+    _, struct = _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+    return rtype, struct
+
+
+def _default_filter_handler(ast, ctx, macroses, config):
+    default_value_rtype, default_value_struct = visit_expr(
+            ast.args[0],
+            Context(predicted_struct=Unknown.from_ast(ast.args[0], order_nr=config.ORDER_OBJECT.get_next())),
+            macroses, config=config)
+    node_struct = merge(
+            ctx.get_predicted_struct(),
+        default_value_rtype,
+    )
+    node_struct.used_with_default = True
+    node_struct.value = default_value_rtype.value
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _dictsort_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_LIST_OF_PAIRS, ast)
+    node_struct = Dictionary.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _join_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_SCALAR, ast)
+    node_struct = List.from_ast(ast.node, String(), order_nr=config.ORDER_OBJECT.get_next())
+    rtype, struct = visit_expr(ast.node, Context(
+        return_struct_cls=String,
+        predicted_struct=node_struct
+    ), macroses, config=config)
+    arg_rtype, arg_struct = visit_expr(ast.args[0],
+                                       Context(predicted_struct=String.from_ast(ast.args[0],
+                                                                                order_nr=config.ORDER_OBJECT.get_next())),
+                                       macroses, config=config)
+    return rtype, merge(struct, arg_struct)
+
+
+def _first_filter_handler(ast, ctx, macroses, config):
+    node_struct = List.from_ast(ast.node, ctx.get_predicted_struct(), order_nr=config.ORDER_OBJECT.get_next())
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _length_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_SCALAR, ast)
+    node_struct = List.from_ast(ast.node, Unknown(), order_nr=config.ORDER_OBJECT.get_next())
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct, Number)
+
+
+def _sum_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_SCALAR, ast)
+    node_struct = List.from_ast(ast.node, Scalar(), order_nr=config.ORDER_OBJECT.get_next())
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _sequence_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_LIST_OF_UNKNOWNS, ast)
+    node_struct = merge(
+        _LIST_OF_UNKNOWNS,
+        ctx.get_predicted_struct()
+    )
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _list_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_LIST_OF_SCALARS, ast)
+    node_struct = merge(
+        List(Scalar.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())),
+        ctx.get_predicted_struct()
+    ).item
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _pprint_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_SCALAR, ast)
+    return _visit_filtered_node(ast, ctx, macroses, config, ctx.get_predicted_struct())
+
+
+def _xmlattr_filter_handler(ast, ctx, macroses, config):
+    ctx.meet(_SCALAR, ast)
+    node_struct = Dictionary.from_ast(ast.node, order_nr=config.ORDER_OBJECT.get_next())
+    return _visit_filtered_node(ast, ctx, macroses, config, node_struct)
+
+
+def _attr_filter_handler(ast, ctx, macroses, config):
+    raise InvalidExpression(ast, 'attr filter is not supported')
+
+
+# a filter name -> handler dispatch table; general handlers are registered
+# first so that more specific ones (e.g. ``wordcount``) override them
+_filter_handlers = {}
+for _name in _SCALAR_FILTER_NAMES:
+    _filter_handlers[_name] = _make_scalar_filter_handler(Scalar)
+for _name in _STRING_FILTER_NAMES:
+    _filter_handlers[_name] = _make_scalar_filter_handler(String, String)
+for _name in _SEQUENCE_FILTER_NAMES:
+    _filter_handlers[_name] = _sequence_filter_handler
+for _name in ('first', 'last', 'random'):
+    _filter_handlers[_name] = _first_filter_handler
+_filter_handlers.update({
+    'abs': _make_scalar_filter_handler(Number, Number),
+    'round': _make_scalar_filter_handler(Number, Number),
+    'float': _make_scalar_filter_handler(Scalar, Number),
+    'int': _make_scalar_filter_handler(Scalar, Number),
+    'filesizeformat': _make_scalar_filter_handler(Number, String),
+    'string': _make_scalar_filter_handler(Scalar, String),
+    'wordcount': _make_scalar_filter_handler(String, Number),
+    'batch': _batch_filter_handler,
+    'slice': _batch_filter_handler,
+    'default': _default_filter_handler,
+    'dictsort': _dictsort_filter_handler,
+    'join': _join_filter_handler,
+    'length': _length_filter_handler,
+    'sum': _sum_filter_handler,
+    'list': _list_filter_handler,
+    'pprint': _pprint_filter_handler,
+    'xmlattr': _xmlattr_filter_handler,
+    'attr': _attr_filter_handler,
+})
+del _name
+
+
+@visits_expr(nodes.Filter)
+def visit_filter(ast, ctx, macroses=None, config=default_config):
+    handler = _filter_handlers.get(ast.name)
+    if handler is None:
+        raise InvalidExpression(ast, 'unknown filter')
+    return handler(ast, ctx, macroses, config)
 
 
 # :class:`nodes.Literal` visitors
@@ -544,8 +636,8 @@ def visit_template_data(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Const)
 def visit_const(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Scalar(), ast)
-    if isinstance(ast.value, _compat.string_types):
+    ctx.meet(_SCALAR, ast)
+    if isinstance(ast.value, str):
         rtype = String.from_ast(ast, constant=True, order_nr=config.ORDER_OBJECT.get_next())
     elif isinstance(ast.value, bool):
         rtype = Boolean.from_ast(ast, constant=True, order_nr=config.ORDER_OBJECT.get_next())
@@ -558,7 +650,7 @@ def visit_const(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Tuple)
 def visit_tuple(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Tuple(None), ast)
+    ctx.meet(_ANY_TUPLE, ast)
 
     struct = Dictionary()
     item_structs = []
@@ -572,10 +664,10 @@ def visit_tuple(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.List)
 def visit_list(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(List(Unknown()), ast)
+    ctx.meet(_LIST_OF_UNKNOWNS, ast)
     struct = Dictionary()
 
-    predicted_struct = merge(List(Unknown()), ctx.get_predicted_struct()).item
+    predicted_struct = merge(_LIST_OF_UNKNOWNS, ctx.get_predicted_struct()).item
     el_rtype = None
     for item in ast.items:
         item_rtype, item_struct = visit_expr(item, Context(predicted_struct=predicted_struct), macroses, config=config)
@@ -590,7 +682,7 @@ def visit_list(ast, ctx, macroses=None, config=default_config):
 
 @visits_expr(nodes.Dict)
 def visit_dict(ast, ctx, macroses=None, config=default_config):
-    ctx.meet(Dictionary(), ast)
+    ctx.meet(_DICTIONARY, ast)
     return _visit_dict(ast, ctx, macroses, [(item.key, item.value) for item in ast.items], config=config)
 
 
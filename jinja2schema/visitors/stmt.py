@@ -6,7 +6,7 @@ jinja2schema.visitors.stmt
 Statement is an instance of :class:`jinja2.nodes.Stmt`.
 Statement visitors return :class:`.models.Dictionary` of structures of variables used within the statement.
 """
-import functools
+from itertools import zip_longest
 
 from jinja2 import nodes, Environment, PackageLoader
 from jinja2schema.config import default_config
@@ -15,7 +15,6 @@ from ..model import Scalar, Dictionary, List, Unknown, Tuple, Boolean
 from ..macro import Macro
 from ..mergers import merge, merge_many
 from ..exceptions import InvalidExpression
-from .._compat import iteritems, izip, zip_longest
 from .expr import Context, visit_expr
 from .util import visit_many
 
@@ -30,11 +29,7 @@ def visits_stmt(node_cls):
     """
     def decorator(func):
         stmt_visitors[node_cls] = func
-        @functools.wraps(func)
-        def wrapped_func(ast, macroses=None, config=default_config, child_blocks=None):
-            assert isinstance(ast, node_cls)
-            return func(ast, macroses, config, child_blocks)
-        return wrapped_func
+        return func
     return decorator
 
 
@@ -44,13 +39,19 @@ def visit_stmt(ast, macroses=None, config=default_config, child_blocks=None):
     :param ast: instance of :class:`jinja2.nodes.Stmt`
     :returns: :class:`.model.Dictionary`
     """
-    visitor = stmt_visitors.get(type(ast))
+    ast_cls = type(ast)
+    visitor = stmt_visitors.get(ast_cls)
     if not visitor:
-        for node_cls, visitor_ in iteritems(stmt_visitors):
-            if isinstance(ast, node_cls):
-                visitor = visitor_
-    if not visitor:
-        raise Exception('stmt visitor for {0} is not found'.format(type(ast)))
+        # walk the MRO so that the most specific registered visitor wins
+        for node_cls in ast_cls.__mro__:
+            visitor = stmt_visitors.get(node_cls)
+            if visitor:
+                break
+        if not visitor:
+            raise Exception('stmt visitor for {0} is not found'.format(ast_cls))
+        # remember the resolution so that it runs at most once per concrete
+        # node class
+        stmt_visitors[ast_cls] = visitor
     return visitor(ast, macroses, config)
 
 
@@ -66,12 +67,19 @@ def visit_for(ast, macroses=None, config=default_config, child_blocks=None):
         del body_struct['loop']
 
     if isinstance(ast.target, nodes.Tuple):
-        target_struct = Tuple.from_ast(
-            ast.target,
-            [body_struct.pop(item.name, Unknown.from_ast(ast.target, order_nr=config.ORDER_OBJECT.get_next()))
-             for item in ast.target.items], order_nr=config.ORDER_OBJECT.get_next())
+        # build the Unknown fallback only for targets the body does not use,
+        # so no allocation (or order number) is wasted on a popped key
+        target_items = []
+        for item in ast.target.items:
+            var = body_struct.pop(item.name, None)
+            if var is None:
+                var = Unknown.from_ast(ast.target, order_nr=config.ORDER_OBJECT.get_next())
+            target_items.append(var)
+        target_struct = Tuple.from_ast(ast.target, target_items, order_nr=config.ORDER_OBJECT.get_next())
     else:
-        target_struct = body_struct.pop(ast.target.name, Unknown.from_ast(ast, order_nr=config.ORDER_OBJECT.get_next()))
+        target_struct = body_struct.pop(ast.target.name, None)
+        if target_struct is None:
+            target_struct = Unknown.from_ast(ast, order_nr=config.ORDER_OBJECT.get_next())
 
     iter_rtype, iter_struct = visit_expr(
         ast.iter,
@@ -97,7 +105,7 @@ def visit_if(ast, macroses=None, config=default_config, child_blocks=None):
     else_struct = visit_many(ast.else_, macroses, config, predicted_struct_cls=Scalar) if ast.else_ else Dictionary()
     struct = merge_many(test_struct, if_struct, else_struct)
 
-    for var_name, var_struct in iteritems(test_struct):
+    for var_name, var_struct in test_struct.items():
         if var_struct.checked_as_defined or var_struct.checked_as_undefined:
             if var_struct.checked_as_undefined:
                 lookup_struct = if_struct
@@ -127,7 +135,7 @@ def visit_assign(ast, macroses=None, config=default_config, child_blocks=None):
             if len(ast.target.items) != len(ast.node.items):
                 raise InvalidExpression(ast, 'number of items in left side is different '
                                              'from right side')
-            for name_ast, var_ast in izip(ast.target.items, ast.node.items):
+            for name_ast, var_ast in zip(ast.target.items, ast.node.items):
                 variables.append((name_ast.name, var_ast))
         for var_name, var_ast in variables:
             var_rtype, var_struct = visit_expr(var_ast, Context(
@@ -188,7 +196,7 @@ def visit_macro(ast, macroses=None, config=default_config, child_blocks=None):
     for arg_name, arg_type in args:
         args_struct[arg_name] = arg_type
 
-    for arg in args_struct.iterkeys():
+    for arg in args_struct.keys():
         body_struct.pop(arg, None)
     return body_struct
 
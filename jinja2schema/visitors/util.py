@@ -29,14 +29,16 @@ def visit_many(nodes, macroses, config, predicted_struct_cls=Scalar, return_stru
                                    using this class by calling :meth:`from_ast` method
     :return: :class:`Dictionary`
     """
-    rv = Dictionary()
+    rv = None
     for node in nodes:
         if isinstance(node, jinja2.nodes.Extends):
             structure = visit_extends(node, macroses, config, [x for x in nodes if isinstance(x, jinja2.nodes.Block)])
         else:
             structure = visit(node, macroses, config, predicted_struct_cls, return_struct_cls)
-        rv = merge(rv, structure)
-    return rv
+        # the first structure is taken as is -- merging it into an empty
+        # Dictionary would only clone it
+        rv = structure if rv is None else merge(rv, structure)
+    return rv if rv is not None else Dictionary()
 
 
 # keep these at the end of file to avoid circular imports